@@ -0,0 +1,212 @@
+"""
+Shared helpers for the Ekomenu recipe discovery scripts: login and saved-session
+handling, cookie dialog dismissal, date ranges, and the ID/URL list files.
+The session is stored as a Playwright storage_state file so later runs can skip the login.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from playwright.sync_api import TimeoutError as PWTimeout
+
+DEFAULT_STATE_PATH = Path(os.getenv("XDG_STATE_HOME") or Path.home() / ".local" / "state") / "ekomenu" / "state.json"
+STATE_MAX_AGE = 20 * 3600  # seconds before a saved session is considered stale
+
+# Most recent processed dates that are clicked again in --incremental mode
+RECHECK_DATES = 2
+
+# Milliseconds to wait for a navigation before robust_goto retries it
+GOTO_TIMEOUT = 8000
+
+# Requests the scrapers never need: page visuals and third-party trackers.
+# Stylesheets still load, since clicks rely on the page layout.
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+_BLOCKED_HOSTS = ("googletagmanager", "google-analytics", "doubleclick", "hotjar", "cookiebot", "facebook")
+
+# Cookiebot consent buttons, tried in order: element ids, then button labels
+# (case-insensitive substring, like Playwright's :has-text)
+_COOKIEBOT_BUTTON_IDS = [
+    "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
+    "CybotCookiebotDialogBodyLevelButtonLevelOptinAllowallSelection",
+    "CybotCookiebotDialogBodyLevelButtonAccept",
+    "CybotCookiebotDialogBodyLevelButtonLevelOptinDeclineAll",
+]
+_COOKIEBOT_BUTTON_LABELS = [
+    "alles accepteren",
+    "accepteer",
+    "akkoord",
+    "accept",
+    "selectie toestaan",
+]
+# Returns true when a consent button was clicked; removes the dialog if none is found
+_DISMISS_COOKIEBOT_JS = """
+([ids, labels]) => {
+    const visible = e => !!(e && e.getClientRects().length);
+    const dialog = document.getElementById('CybotCookiebotDialog');
+    if (!visible(dialog)) return false;
+    const buttons = Array.from(document.querySelectorAll('button')).filter(visible);
+    const target = ids.map(id => document.getElementById(id)).find(visible)
+        || labels.map(l => buttons.find(b => b.textContent.toLowerCase().includes(l))).find(Boolean);
+    if (target) {
+        target.click();
+        return true;
+    }
+    dialog.remove();
+    return false;
+}
+"""
+
+def robust_goto(page, url, tries=3):
+    """page.goto with a short timeout, retried with exponential backoff on timeouts."""
+    delay = 1
+    for attempt in range(tries):
+        try:
+            return page.goto(url, wait_until="domcontentloaded", timeout=GOTO_TIMEOUT)
+        except PWTimeout:
+            if attempt == tries - 1:
+                raise
+            print(f"  Timed out loading {url}, retrying in {delay}s")
+            page.wait_for_timeout(delay * 1000)
+            delay *= 2
+
+def dismiss_cookiebot(page):
+    """Handles Cookiebot overlay that intercepts clicks, in a single evaluate round trip.
+
+    With preseed_cookie_consent the dialog is normally never rendered, and the
+    evaluate returns straight away.
+    """
+    try:
+        if page.evaluate(_DISMISS_COOKIEBOT_JS, [_COOKIEBOT_BUTTON_IDS, _COOKIEBOT_BUTTON_LABELS]):
+            page.locator("#CybotCookiebotDialog").wait_for(state="hidden", timeout=5000)
+    except Exception:
+        # last resort: remove it
+        try:
+            page.evaluate("() => { const d = document.getElementById('CybotCookiebotDialog'); if (d) d.remove(); }")
+        except Exception:
+            pass
+
+def preseed_cookie_consent(context):
+    """Pre-accept Cookiebot for the whole context, so its dialog never shows up."""
+    context.add_cookies([{
+        "name": "CookieConsent",
+        "value": "{stamp:'-',necessary:true,preferences:true,statistics:true,marketing:true,ver:1,utc:%d,region:'nl'}"
+                 % int(time.time() * 1000),
+        "domain": ".ekomenu.nl",
+        "path": "/",
+    }])
+    context.add_init_script("try { localStorage.setItem('CookieConsent', 'true') } catch (e) {}")
+
+def block_unneeded_requests(context, block_images=True):
+    """Abort image/font/media and tracker requests for every page in the context.
+
+    Pass block_images=False for pages that click on images (they need their size).
+    """
+    blocked_types = _BLOCKED_RESOURCE_TYPES if block_images else _BLOCKED_RESOURCE_TYPES - {"image"}
+    def _route(route):
+        request = route.request
+        if request.resource_type in blocked_types:
+            return route.abort()
+        host = urlsplit(request.url).hostname or ""
+        if any(h in host for h in _BLOCKED_HOSTS):
+            return route.abort()
+        return route.continue_()
+    context.route("**/*", _route)
+
+def state_is_fresh(state_path, max_age=STATE_MAX_AGE):
+    """True if a saved session exists and was written less than max_age seconds ago."""
+    state_path = Path(state_path)
+    return state_path.exists() and time.time() - state_path.stat().st_mtime < max_age
+
+def save_state(context, state_path):
+    """Write the context's cookies/localStorage to state_path."""
+    state_path = Path(state_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    context.storage_state(path=str(state_path))
+
+def login_and_save(page, email, password, state_path):
+    """Log in on page and save the session to state_path. Returns False if login failed."""
+    robust_goto(page, "https://www.ekomenu.nl/login")
+    dismiss_cookiebot(page)
+
+    page.fill("input[type='email']", email)
+    page.fill("input[type='password']", password)
+    page.click("button:has-text('Inloggen')")
+
+    # Wait for the redirect away from /login rather than networkidle
+    try:
+        page.wait_for_url(lambda u: "login" not in u, wait_until="commit", timeout=10000)
+    except PWTimeout:
+        pass
+
+    if "login" in page.url:
+        return False
+
+    save_state(page.context, state_path)
+    print(f"Session state saved to {state_path}")
+    return True
+
+def generate_date_range(start_date, end_date=None):
+    """Generate weekly dates from start_date to end_date (or current date)."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    if end_date is None:
+        end = datetime.now()
+    else:
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+    
+    dates = []
+    current = start
+    while current <= end:
+        dates.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(weeks=1)
+    
+    return dates
+
+def recipe_url(recipe_id):
+    """Date-independent recipe URL for a recipe ID."""
+    return f"https://www.ekomenu.nl/user?recipe={recipe_id}"
+
+def load_existing_ids(ids_file):
+    """Load existing recipe IDs from file if it exists."""
+    if not ids_file.exists():
+        return set()
+    return {line for line in map(str.strip, ids_file.read_text().splitlines()) if line.isdigit()}
+
+def save_ids(ids_file, recipe_ids):
+    """Save recipe IDs to file, sorted numerically; returns the sorted IDs."""
+    ids_file.parent.mkdir(parents=True, exist_ok=True)
+    # The key is computed once per ID; the ID strings are written unchanged
+    sorted_ids = sorted(recipe_ids, key=int)
+    ids_file.write_text("".join(f"{recipe_id}\n" for recipe_id in sorted_ids))
+    return sorted_ids
+
+def load_processed_dates(dates_file):
+    """Load date button texts clicked on earlier runs, minus the most recent ones.
+
+    The last RECHECK_DATES entries are dropped so recent weeks get re-clicked
+    and pick up late menu changes.
+    """
+    if not dates_file.exists():
+        return []
+    dates = [line.strip() for line in dates_file.read_text().splitlines() if line.strip()]
+    return dates[:-RECHECK_DATES] if len(dates) > RECHECK_DATES else []
+
+def save_processed_dates(dates_file, dates):
+    """Atomically rewrite the processed-dates file (write to tmp, then replace)."""
+    dates_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = dates_file.with_name(dates_file.name + ".tmp")
+    tmp_file.write_text("".join(f"{d}\n" for d in dates))
+    os.replace(tmp_file, dates_file)
+
+def load_existing_urls(urls_file):
+    """Load existing URLs from file if it exists."""
+    if not urls_file.exists():
+        return set()
+    return {line for line in map(str.strip, urls_file.read_text().splitlines()) if line.startswith('https://')}
+
+def save_urls(urls_file, urls):
+    """Save URLs to file, sorted for consistent output."""
+    urls_file.parent.mkdir(parents=True, exist_ok=True)
+    urls_file.write_text("".join(f"{url}\n" for url in sorted(urls)))
@@ -6,49 +6,46 @@ as ekomenu2yml.py when multiple URLs are provided.
 """
 
 import argparse
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import yaml
 import re
 
+from recipe_yaml import write_yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+_RATING_RE = re.compile(r'Beoordeling: ([\d.,]+)')
+
 def load_recipe_yaml(yaml_path):
     """Load a single recipe YAML file and return the recipe data."""
     try:
-        with open(yaml_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        # Read as bytes: libyaml decodes the UTF-8 stream itself
+        with open(yaml_path, 'rb') as f:
+            data = yaml.load(f, Loader=_Loader)
         return data
     except Exception as e:
         print(f"Error loading {yaml_path}: {e}", file=sys.stderr)
         return None
 
-def render_recipe_fields(d: dict, lines: list, indent: str):
-    """Render recipe fields with proper indentation (copied from ekomenu2yml.py)."""
-    def push(k, v):
-        if v in (None, "", []): return
-        if isinstance(v, str) and ("\n" in v or k in {"notes", "ingredients", "directions", "nutritional_info", "photo"}):
-            lines.append(f"{indent}{k}: |")
-            lines.extend(f"{indent}  {ln}" for ln in v.split("\n"))
-        else:
-            lines.append(f"{indent}{k}: {v}")
-    push("servings", d.get("servings"))
-    push("cook_time", d.get("cook_time"))
-    push("source", d.get("source"))
-    push("source_url", d.get("source_url"))
-    push("photo", d.get("photo"))
-    push("nutritional_info", d.get("nutritional_info"))
-    push("notes", d.get("notes"))
-    push("ingredients", d.get("ingredients"))
-    push("directions", d.get("directions"))
-
-def render_combined_yaml(recipes):
-    """Render multiple recipes in combined YAML format (copied from ekomenu2yml.py)."""
-    lines = []
-    for i, d in enumerate(recipes):
-        if i > 0:
-            lines.append("")
-        lines.append("- name: " + (d.get("name") or ""))
-        render_recipe_fields(d, lines, "  ")
-    return "\n".join(lines) + "\n"
+def extract_rating(recipe):
+    """Extract rating from recipe notes."""
+    notes = recipe.get("notes") or ""
+    # Cheap substring test first; most notes without a rating skip the regex
+    if "Beoordeling:" not in notes:
+        return 0.0
+    match = _RATING_RE.search(notes)
+    if match:
+        try:
+            return float(match.group(1).replace(',', '.'))
+        except ValueError:
+            return 0.0
+    return 0.0
 
 def main():
     parser = argparse.ArgumentParser(description="Combine individual YAML recipe files into one combined file")
@@ -61,14 +58,20 @@ def main():
     args = parser.parse_args()
     
     # Load all recipe files
-    recipes = []
+    yaml_paths = []
     for yaml_file in args.yaml_files:
         yaml_path = Path(yaml_file)
         if not yaml_path.exists():
             print(f"File not found: {yaml_file}", file=sys.stderr)
             continue
-            
-        recipe_data = load_recipe_yaml(yaml_path)
+        yaml_paths.append(yaml_path)
+
+    # Parse in parallel; map() keeps results in input order
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 2)) as ex:
+        loaded = list(ex.map(load_recipe_yaml, yaml_paths))
+
+    recipes = []
+    for yaml_path, recipe_data in zip(yaml_paths, loaded):
         if recipe_data:
             recipes.append(recipe_data)
             print(f"Loaded: {yaml_path.name}")
@@ -79,27 +82,16 @@ def main():
     
     # Sort by rating if requested
     if args.sort_by_rating:
-        def extract_rating(recipe):
-            """Extract rating from recipe notes."""
-            notes = recipe.get("notes", "")
-            if notes:
-                match = re.search(r'Beoordeling: ([\d.,]+)', notes)
-                if match:
-                    try:
-                        return float(match.group(1).replace(',', '.'))
-                    except ValueError:
-                        return 0.0
-            return 0.0
-        
-        recipes.sort(key=extract_rating, reverse=True)
+        # Extract each rating exactly once, then sort indices (stable, like list.sort)
+        ratings = [extract_rating(r) for r in recipes]
+        order = sorted(range(len(recipes)), key=ratings.__getitem__, reverse=True)
+        recipes = [recipes[i] for i in order]
         print(f"Sorted {len(recipes)} recipes by rating (highest first)")
     
-    # Generate combined YAML
-    combined_yaml = render_combined_yaml(recipes)
-    
-    # Write output
+    # Stream combined YAML straight to the output file
     output_path = Path(args.output)
-    output_path.write_text(combined_yaml, encoding='utf-8')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        write_yaml(recipes, f)
     
     print(f"Combined {len(recipes)} recipes into: {output_path}")
 
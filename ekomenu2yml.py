@@ -5,71 +5,96 @@ ekomenu2yml — Login to Ekomenu, open recipe URLs, and export YAML.
 Usage:
   ./ekomenu2yml.py [--email you@example.com] [--password SECRET]
                    [--use-state state.json] [--save-state state.json]
-                   [--servings N] [--headful] [-o OUTDIR]
+                   [--servings N] [--headful] [--external-photos] [--tabs N] [-o OUTDIR]
                    URL [URL ...]
+
+--tabs N loads up to N recipe pages in parallel tabs of the same logged-in
+browser context (default: 4).
 """
 
 import argparse
 import base64
+import hashlib
 import os
 import re
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
 
 from bs4 import BeautifulSoup
+try:
+    import lxml  # noqa: F401
+    _PARSER = "lxml"
+except ImportError:
+    _PARSER = "html.parser"
 from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
 
+from _ekomenu_common import (
+    DEFAULT_STATE_PATH, GOTO_TIMEOUT, block_unneeded_requests, dismiss_cookiebot,
+    preseed_cookie_consent, robust_goto, save_state,
+)
+from recipe_yaml import write_yaml
+
 # --- In-file defaults (optional) ---
 EMAIL = ""       # e.g. "you@example.com"
 PASSWORD = ""    # e.g. "super-secret"
 
-def dismiss_cookiebot(page):
-    # Handles Cookiebot overlay that intercepts clicks.
-    selectors = [
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowallSelection",
-        "#CybotCookiebotDialogBodyLevelButtonAccept",
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinDeclineAll",
-        "button:has-text('Alles accepteren')",
-        "button:has-text('Accepteer')",
-        "button:has-text('Akkoord')",
-        "button:has-text('Accept')",
-        "button:has-text('Selectie toestaan')",
-    ]
-    try:
-        dialog = page.locator("#CybotCookiebotDialog")
-        if dialog.is_visible(timeout=1500):
-            for sel in selectors:
-                loc = page.locator(sel)
-                if loc.count() and loc.first.is_visible():
-                    loc.first.click(timeout=1500)
-                    break
-            dialog.wait_for(state="hidden", timeout=5000)
-    except Exception:
-        # last resort: remove it
-        try:
-            el = page.query_selector("#CybotCookiebotDialog")
-            page.evaluate("d => d && d.remove()", el)
-        except Exception:
-            pass
+# Shared HTTP session so image downloads reuse keep-alive connections
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = "ekomenu2yml/1.0"
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# On-disk cache of downloaded images, revalidated with conditional GETs
+_IMAGE_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "ekomenu2yml"
+# Image file extensions kept for --external-photos; anything else is saved as .jpg
+_PHOTO_EXTS = frozenset({".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif"})
+
+# Nutrient names (span pairs: <span>Name</span><span>Value</span>) and their values
+_NUTRI_RE = re.compile(r"koolhydraten|eiwit|vet|vezels|suikers|zout|energie|natrium|calcium|vitaminen", re.I)
+_VAL_RE = re.compile(r'\d+[.,]?\d*\s*[gmkl]')
+
+# Patterns used while parsing recipe pages, compiled once per run
+_MIN_RE = re.compile(r"\bmin\b")
+_VEG_RE = re.compile(r"\b\d+\s*g\s*groente\b")
+_WS_RE = re.compile(r"\s+")
+_HERK_RE = re.compile(r"Herkomst:.*")
+_UNIT_RE = re.compile(r"\s+(st|g|el|tl|ml|kg)\b")
+_COUNTER_RE = re.compile(r"\bcounter\b")
+_TIP_RE = re.compile(r"\bTIP\b")
+_TAGS_RE = re.compile(r"Seizoen|Vegetarisch|Variatie|Lekker snel")
+_VOED_RE = re.compile(r"Voedingswaarden")
+_REVIEWS_RE = re.compile(r'(\d+)\s+reviews?')
+_RATING_RE = re.compile(r'Beoordeling: ([\d.,]+)')
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+_WORD_RE = re.compile(r'\b\w{3,}\b')
+_NL_STOP = frozenset({'met', 'van', 'en', 'de', 'het', 'een'})
+
+# Tags that parse_html_to_data scans document-wide
+_INDEXED_TAGS = ("span", "div", "h2", "h3", "img")
 
 def text(el):
     return (el.get_text(" ", strip=True) if el else "").strip()
 
-def get_recipe_image_base64(soup, recipe_name="") -> str | None:
-    """Extract the main recipe image and convert to base64, matching recipe name if possible."""
-    # Look for all recipe images
-    all_imgs = soup.find_all("img")
-    
+def _index_tags(soup) -> dict:
+    """Collect the tags parse_html_to_data scans, in document order, with one tree walk."""
+    by_name = {name: [] for name in _INDEXED_TAGS}
+    for el in soup.find_all(_INDEXED_TAGS):
+        by_name[el.name].append(el)
+    return by_name
+
+def _pick_image_url(all_imgs, recipe_name="") -> str | None:
+    """Find the main recipe image URL among the page's <img> tags, matching recipe name if possible."""
     # Create searchable terms from recipe name for matching
     recipe_terms = []
     if recipe_name:
         # Extract key words from recipe name
         name_lower = recipe_name.lower()
-        terms = re.findall(r'\b\w{3,}\b', name_lower)  # Words with 3+ characters
-        recipe_terms = [term for term in terms if term not in ['met', 'van', 'en', 'de', 'het', 'een']]
+        terms = _WORD_RE.findall(name_lower)  # Words with 3+ characters
+        recipe_terms = [term for term in terms if term not in _NL_STOP]
     
     img_url = None
     best_match = None
@@ -83,8 +108,9 @@ def get_recipe_image_base64(soup, recipe_name="") -> str | None:
             # Calculate match score based on recipe name
             score = 0
             if recipe_terms:
+                src_l = src.lower()
                 for term in recipe_terms:
-                    if term in src.lower():
+                    if term in src_l:
                         score += 2
                     if term in alt:
                         score += 3
@@ -116,19 +142,75 @@ def get_recipe_image_base64(soup, recipe_name="") -> str | None:
     elif not img_url.startswith("http"):
         img_url = "https://static.ekomenu.nl" + img_url
     
+    return img_url
+
+def _atomic_write(path: Path, data: bytes):
+    """Write data to path via a unique temp file and os.replace (safe across threads)."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
     try:
-        response = requests.get(img_url, timeout=10)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+def _fetch_image(img_url: str | None) -> bytes | None:
+    """Download an image, revalidating the on-disk cache, and return its bytes."""
+    if not img_url:
+        return None
+
+    key = hashlib.sha256(img_url.encode("utf-8")).hexdigest()
+    img_path = _IMAGE_CACHE_DIR / f"{key}.img"
+    etag_path = _IMAGE_CACHE_DIR / f"{key}.etag"
+    lastmod_path = _IMAGE_CACHE_DIR / f"{key}.lastmod"
+
+    # Only revalidate when we still have the cached image to fall back on
+    headers = {}
+    if img_path.exists():
+        if etag_path.exists():
+            headers["If-None-Match"] = etag_path.read_text(encoding="utf-8")
+        if lastmod_path.exists():
+            headers["If-Modified-Since"] = lastmod_path.read_text(encoding="utf-8")
+
+    try:
+        response = _SESSION.get(img_url, headers=headers, timeout=10)
+        if response.status_code == 304 and headers:
+            return img_path.read_bytes()
         if response.status_code == 200:
-            # Encode to base64
-            img_base64 = base64.b64encode(response.content).decode('utf-8')
-            return img_base64
+            etag = response.headers.get("ETag")
+            lastmod = response.headers.get("Last-Modified")
+            if etag or lastmod:
+                try:
+                    _IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                    # Drop the old validators first and write the new ones only after
+                    # the image is in place, so a 304 never vouches for another image
+                    etag_path.unlink(missing_ok=True)
+                    lastmod_path.unlink(missing_ok=True)
+                    _atomic_write(img_path, response.content)
+                    if etag:
+                        _atomic_write(etag_path, etag.encode("utf-8"))
+                    if lastmod:
+                        _atomic_write(lastmod_path, lastmod.encode("utf-8"))
+                except OSError:
+                    pass  # caching is best-effort
+            return response.content
     except Exception:
         pass
     
     return None
 
+def _fetch_and_b64(img_url: str | None) -> str | None:
+    """Download an image and return it base64-encoded."""
+    raw = _fetch_image(img_url)
+    if not raw:
+        return None
+    # base64 output is pure ASCII, so skip the UTF-8 decoder
+    return base64.b64encode(raw).decode('ascii')
+
 def parse_html_to_data(html: str, url: str = None, override_servings: int | None = None) -> dict:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, _PARSER)
+    tags_by_name = _index_tags(soup)
 
     title_h1 = soup.find("h1", attrs={"itemprop": "name"}) or soup.find("h1")
     name_main = ""
@@ -146,11 +228,12 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
     chips = [text(x) for x in soup.select(".chip .text-sm, .chip time")]
     cook_time, kcal, veg = "", "", ""
     for c in chips:
-        if re.search(r"\bmin\b", c):
+        c_l = c.lower()
+        if _MIN_RE.search(c):
             cook_time = c
-        elif "kcal" in c.lower():
+        elif "kcal" in c_l:
             kcal = c
-        elif re.search(r"\b\d+\s*g\s*groente\b", c.lower()):
+        elif _VEG_RE.search(c_l):
             veg = c
 
     # Default to 2 servings as ingredients are listed for 2 people
@@ -164,14 +247,14 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
             t = text(li)
             if not t:
                 continue
-            t = re.sub(r"\s+", " ", t)
-            t = re.sub(r"Herkomst:.*", "", t).strip()
-            t = re.sub(r"\s+(st|g|el|tl|ml|kg)\b", r" \1", t)
+            t = _WS_RE.sub(" ", t)
+            t = _HERK_RE.sub("", t).strip()
+            t = _UNIT_RE.sub(r" \1", t)
             items.append(t)
         return items
 
     ingredients, zelf_toevoegen = [], []
-    for h2 in soup.find_all("h2"):
+    for h2 in tags_by_name["h2"]:
         if "Biologische ingrediënten" in text(h2):
             container = h2.parent
             uls = container.find_all("ul")
@@ -194,7 +277,7 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
         ingredients += [f"{it} (zelf toevoegen)" for it in zelf_toevoegen]
 
     directions = []
-    directions_ol = soup.find("ol", class_=re.compile(r"\bcounter\b"))
+    directions_ol = soup.find("ol", class_=_COUNTER_RE)
     if directions_ol:
         for i, li in enumerate(directions_ol.find_all("li"), 1):
             s = text(li)
@@ -202,7 +285,7 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
                 directions.append(f"{i}. {s}")
 
     tip_text = ""
-    for badge in soup.find_all(string=re.compile(r"\bTIP\b")):
+    for badge in soup.find_all(string=_TIP_RE):
         parent = badge.parent
         if parent and parent.name in {"div", "span"}:
             sib_span = parent.find_next("span")
@@ -216,23 +299,18 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
     
     # Search for nutritional span pairs globally in the HTML
     # The pattern we found is: <span>NutrientName</span><span>Value</span>
-    nutritional_terms = ["koolhydraten", "eiwit", "vet", "vezels", "suikers", "zout", "energie", "natrium", "calcium", "vitaminen"]
-    all_spans = soup.find_all("span")
-    
-    for i, span in enumerate(all_spans):
+    for span in tags_by_name["span"]:
         key = text(span).strip()
         
         # Check if this span contains a nutritional term
-        if (key and len(key) > 2 and 
-            any(nutrient in key.lower() for nutrient in nutritional_terms)):
+        if key and len(key) > 2 and _NUTRI_RE.search(key):
             
-            # Look for the next span that contains the value (check immediate next span first)
-            for j in range(i + 1, min(i + 3, len(all_spans))):  # Check up to 2 spans ahead
-                val_span = all_spans[j]
+            # Look for the next span that contains the value (check up to 2 spans ahead)
+            for val_span in span.find_all_next("span", limit=2):
                 val = text(val_span).strip()
                 
                 # Check if this looks like a nutritional value
-                if (val and re.search(r'\d+[.,]?\d*\s*[gmkl]', val) and 
+                if (val and _VAL_RE.search(val) and 
                     len(val) < 20):  # Reasonable value length with units
                     nutri[key] = val
                     break
@@ -241,13 +319,13 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
     voeding_section = None
     
     # Find h3 with "Voedingswaarden"
-    for h3 in soup.find_all("h3"):
+    for h3 in tags_by_name["h3"]:
         if "Voedingswaarden" in text(h3):
             voeding_section = h3.find_parent()
             break
     
     if not voeding_section:
-        for element in soup.find_all(string=re.compile(r"Voedingswaarden")):
+        for element in soup.find_all(string=_VOED_RE):
             parent = element.parent
             while parent and parent.name not in ["div", "section"]:
                 parent = parent.parent
@@ -263,10 +341,10 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
                 allergenen.append(allergen_text)
 
     tags = []
-    for div in soup.find_all("div"):
+    for div in tags_by_name["div"]:
         cls = " ".join(div.get("class", []))
         if all(x in cls for x in ["flex", "bg-e-white", "rounded-lg", "flex-wrap"]):
-            if div.find("span", string=re.compile(r"Seizoen|Vegetarisch|Variatie|Lekker snel")):
+            if div.find("span", string=_TAGS_RE):
                 tags = [t.strip().rstrip(",") for t in (sp.get_text() for sp in div.find_all("span")) if t.strip()]
 
     nutri_lines = []
@@ -300,7 +378,7 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
     if rating_count_elem:
         rating_text = text(rating_count_elem).strip()
         # Extract number from text like "Gemiddelde van 52 reviews"
-        match = re.search(r'(\d+)\s+reviews?', rating_text)
+        match = _REVIEWS_RE.search(rating_text)
         if match:
             rating_count = match.group(1)
 
@@ -312,8 +390,8 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
     if tip_text:
         notes_lines.append(f"Tip: {tip_text}")
 
-    # Extract recipe image
-    photo_base64 = get_recipe_image_base64(soup, name)
+    # Pick the recipe image; main() downloads all images in one parallel pass
+    photo_url = _pick_image_url(tags_by_name["img"], name)
 
     return {
         "name": name,
@@ -321,51 +399,22 @@ def parse_html_to_data(html: str, url: str = None, override_servings: int | None
         "cook_time": cook_time,
         "source": "Ekomenu",
         "source_url": url,
-        "photo": photo_base64,
+        "photo": None,
+        "photo_url": photo_url,
         "nutritional_info": "\n".join(nutri_lines).strip() or None,
         "notes": "\n".join(notes_lines).strip() or None,
         "ingredients": "\n".join(ingredients).strip() if ingredients else None,
         "directions": "\n".join(directions).strip() if directions else None,
     }
 
-def render_yaml(data) -> str:
-    if isinstance(data, list):
-        # Multiple recipes
-        lines = []
-        for i, d in enumerate(data):
-            if i > 0:
-                lines.append("")
-            lines.append("- name: " + (d.get("name") or ""))
-            render_recipe_fields(d, lines, "  ")
-        return "\n".join(lines) + "\n"
-    else:
-        # Single recipe
-        lines = []
-        lines.append("name: " + (data.get("name") or ""))
-        render_recipe_fields(data, lines, "")
-        return "\n".join(lines) + "\n"
-
-def render_recipe_fields(d: dict, lines: list, indent: str):
-    def push(k, v):
-        if v in (None, "", []): return
-        if isinstance(v, str) and ("\n" in v or k in {"notes", "ingredients", "directions", "nutritional_info", "photo"}):
-            lines.append(f"{indent}{k}: |")
-            lines.extend(f"{indent}  {ln}" for ln in v.split("\n"))
-        else:
-            lines.append(f"{indent}{k}: {v}")
-    push("servings", d.get("servings"))
-    push("cook_time", d.get("cook_time"))
-    push("source", d.get("source"))
-    push("source_url", d.get("source_url"))
-    push("photo", d.get("photo"))
-    push("nutritional_info", d.get("nutritional_info"))
-    push("notes", d.get("notes"))
-    push("ingredients", d.get("ingredients"))
-    push("directions", d.get("directions"))
+def _photo_ext(img_url: str | None) -> str:
+    """File extension for a downloaded photo, from its URL path (default .jpg)."""
+    ext = os.path.splitext(urlparse(img_url or "").path)[1].lower()
+    return ext if ext in _PHOTO_EXTS else ".jpg"
 
 def slugify(s: str) -> str:
     s = s.lower()
-    s = re.sub(r"[^a-z0-9]+", "-", s).strip("-")
+    s = _SLUG_RE.sub("-", s).strip("-")
     return s or "recipe"
 
 def recipe_id_from_url(u: str) -> str:
@@ -375,7 +424,7 @@ def recipe_id_from_url(u: str) -> str:
     return f"{date}_{rid}" if (rid and date) else (rid or "recipe")
 
 def ekomenu_login(page, email, password):
-    page.goto("https://www.ekomenu.nl/login", wait_until="domcontentloaded")
+    robust_goto(page, "https://www.ekomenu.nl/login")
     dismiss_cookiebot(page)
 
     for c in ["input[type='email']", "input[autocomplete='email']",
@@ -397,11 +446,12 @@ def ekomenu_login(page, email, password):
                 page.locator(sel).click(timeout=10000)
             break
 
-    # Wait for navigation after login with timeout
+    # Wait for the redirect away from /login; analytics traffic means
+    # networkidle rarely arrives, so don't wait for the page to settle
     try:
-        page.wait_for_load_state("networkidle", timeout=15000)
+        page.wait_for_url(lambda u: "login" not in u, wait_until="commit", timeout=10000)
     except PWTimeout:
-        # If networkidle times out, just check if login succeeded
+        # If the redirect never comes, the check below reports the failure
         pass
     
     if "login" in page.url:
@@ -411,7 +461,7 @@ def is_logged_in(page):
     """Check if user is currently logged in to Ekomenu."""
     try:
         # Try to access a recipe page directly to test authentication
-        page.goto("https://www.ekomenu.nl/user?date=2025-09-08&recipe=13712", wait_until="domcontentloaded")
+        robust_goto(page, "https://www.ekomenu.nl/user?date=2025-09-08&recipe=13712")
         # Check for elements that indicate we're on a recipe page vs login page
         try:
             # If we can find the recipe title, we're logged in and can access recipes
@@ -423,8 +473,10 @@ def is_logged_in(page):
     except Exception:
         return False
 
-def open_recipe(page, url):
-    page.goto(url, wait_until="domcontentloaded")
+def open_recipe(page, url, navigate=True):
+    # navigate=False: the caller already started navigating this tab to url
+    if navigate:
+        robust_goto(page, url)
     try:
         page.wait_for_selector("app-recipe h1[itemprop='name'], h1[itemprop='name']",
                                timeout=7000)
@@ -445,13 +497,17 @@ def open_recipe(page, url):
 def main():
     ap = argparse.ArgumentParser(description="Login to Ekomenu and export recipe URLs to YAML")
     ap.add_argument("urls", nargs="+", help="One or more Ekomenu recipe URLs (behind login)")
-    ap.add_argument("--use-state", help="Path to a storage_state.json to preload")
-    ap.add_argument("--save-state", help="Where to save storage_state after login")
+    ap.add_argument("--use-state",
+                    help=f"Path to a storage_state.json to preload (default: {DEFAULT_STATE_PATH}, if it exists)")
+    ap.add_argument("--save-state", help="Where to save storage_state after the run (default: the --use-state path)")
     ap.add_argument("-o", "--outdir", default=".", help="Output directory for YAML files")
     ap.add_argument("--email", help="Ekomenu email")
     ap.add_argument("--password", help="Ekomenu password")
     ap.add_argument("--servings", type=int, help="Override servings count")
     ap.add_argument("--headful", action="store_true", help="Run non-headless for debugging")
+    ap.add_argument("--external-photos", action="store_true",
+                    help="Save photos as image files next to the YAML instead of embedding base64")
+    ap.add_argument("--tabs", type=int, default=4, help="Number of tabs to load recipes in parallel (default: 4)")
     args = ap.parse_args()
 
     email = args.email or os.getenv("EKOMENU_EMAIL") or EMAIL
@@ -466,15 +522,21 @@ def main():
     with sync_playwright() as pw:
         browser = pw.chromium.launch(headless=not args.headful)
 
+        state_path = Path(args.use_state) if args.use_state else DEFAULT_STATE_PATH
+        save_path = Path(args.save_state) if args.save_state else state_path
+        have_state = state_path.exists()
         ctx_kwargs = {}
-        if args.use_state:
-            ctx_kwargs["storage_state"] = args.use_state
+        if have_state:
+            ctx_kwargs["storage_state"] = str(state_path)
         context = browser.new_context(**ctx_kwargs)
+        preseed_cookie_consent(context)
+        # Images stay: open_recipe may have to click the "arrow down" image
+        block_unneeded_requests(context, block_images=False)
         page = context.new_page()
 
         # Check if we need to login
         need_login = True
-        if args.use_state:
+        if have_state:
             # Test if saved state is still valid
             dismiss_cookiebot(page)
             if is_logged_in(page):
@@ -485,19 +547,44 @@ def main():
         
         if need_login:
             ekomenu_login(page, email, password)
-            if args.save_state:
-                context.storage_state(path=args.save_state)
-                print(f"[info] Session state saved to {args.save_state}")
+
+        # Extra tabs share the logged-in context; each batch starts all
+        # navigations first so the pages load in parallel, then reaps them in order
+        n_tabs = max(1, min(args.tabs, len(args.urls)))
+        pages = [page] + [context.new_page() for _ in range(n_tabs - 1)]
 
         recipes = []
-        for url in args.urls:
-            if not open_recipe(page, url):
-                print(f"[warn] Could not open recipe content for {url}", file=sys.stderr)
-                continue
-            html = page.content()
-            data = parse_html_to_data(html, url, override_servings=args.servings)
-            recipes.append(data)
-            print(f"[ok] Scraped {url}")
+        for start in range(0, len(args.urls), n_tabs):
+            batch = list(zip(pages, args.urls[start:start + n_tabs]))
+            started = []
+            for tab, url in batch:
+                try:
+                    tab.goto(url, wait_until="commit", timeout=GOTO_TIMEOUT)
+                    started.append(True)
+                except PWTimeout:
+                    # Retried with robust_goto when this tab is reaped
+                    started.append(False)
+            for (tab, url), navigated in zip(batch, started):
+                if not open_recipe(tab, url, navigate=not navigated):
+                    print(f"[warn] Could not open recipe content for {url}", file=sys.stderr)
+                    continue
+                html = tab.content()
+                data = parse_html_to_data(html, url, override_servings=args.servings)
+                recipes.append(data)
+                print(f"[ok] Scraped {url}")
+
+        # Fetch recipe images concurrently now that all pages are scraped
+        photo_urls = [d.pop("photo_url") for d in recipes]
+        fetch = _fetch_image if args.external_photos else _fetch_and_b64
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            for d, photo_url, photo in zip(recipes, photo_urls, ex.map(fetch, photo_urls)):
+                if photo and args.external_photos:
+                    # Save the raw image next to the YAML and reference it by name
+                    rid = recipe_id_from_url(d["source_url"])
+                    photo_name = f"{rid}_{slugify(d.get('name') or rid)}{_photo_ext(photo_url)}"
+                    (outdir / photo_name).write_bytes(photo)
+                    photo = photo_name
+                d["photo"] = photo
 
         if recipes:
             if len(recipes) == 1:
@@ -509,8 +596,7 @@ def main():
                 rating_prefix = "0.0"  # Default rating if none found
                 if recipes[0].get("notes"):
                     # Look for rating in notes
-                    import re
-                    rating_match = re.search(r'Beoordeling: ([\d.,]+)', recipes[0]["notes"])
+                    rating_match = _RATING_RE.search(recipes[0]["notes"])
                     if rating_match:
                         rating_str = rating_match.group(1).replace(',', '.')
                         try:
@@ -520,14 +606,22 @@ def main():
                             rating_prefix = "0.0"
                 
                 yml_path = outdir / f"{rating_prefix}_{rid}_{slug}.yml"
-                yml_path.write_text(render_yaml(recipes[0]), encoding="utf-8")
+                with open(yml_path, "w", encoding="utf-8") as f:
+                    write_yaml(recipes[0], f)
             else:
                 # Multiple recipes - use combined naming
                 rids = [recipe_id_from_url(url) for url in args.urls]
                 yml_path = outdir / f"recipes_{'_'.join(rids)}.yml"
-                yml_path.write_text(render_yaml(recipes), encoding="utf-8")
+                with open(yml_path, "w", encoding="utf-8") as f:
+                    write_yaml(recipes, f)
             print(f"[saved] {yml_path}")
 
+        # Refresh the saved session so the next run can skip the login, but
+        # never overwrite a good one with a session the site just rejected
+        if recipes and not any("login" in tab.url for tab in pages):
+            save_state(context, save_path)
+            print(f"[info] Session state saved to {save_path}")
+
         context.close()
         browser.close()
 
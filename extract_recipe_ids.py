@@ -7,83 +7,132 @@ Much more efficient than clicking buttons - just captures the 'list' API respons
 import argparse
 import json
 import os
+import re
 import sys
-from datetime import datetime, timedelta
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+from urllib.parse import unquote
+from playwright.sync_api import expect, sync_playwright, TimeoutError as PWTimeout
 
-def dismiss_cookiebot(page):
-    """Handles Cookiebot overlay that intercepts clicks."""
-    selectors = [
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll",
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowallSelection",
-        "#CybotCookiebotDialogBodyLevelButtonAccept",
-        "#CybotCookiebotDialogBodyLevelButtonLevelOptinDeclineAll",
-        "button:has-text('Alles accepteren')",
-        "button:has-text('Accepteer')",
-        "button:has-text('Akkoord')",
-        "button:has-text('Accept')",
-        "button:has-text('Selectie toestaan')",
-    ]
+from _ekomenu_common import (
+    DEFAULT_STATE_PATH, STATE_MAX_AGE, block_unneeded_requests, dismiss_cookiebot,
+    generate_date_range, load_existing_ids, load_processed_dates, login_and_save,
+    preseed_cookie_consent, recipe_url, robust_goto, save_ids, save_processed_dates,
+    save_state, state_is_fresh,
+)
+
+# The ids= query parameter of recipebff/v1/recipe/list calls, and the IDs in it
+_IDS_RE = re.compile(r'[?&]ids=([^&]+)')
+_DIGIT_RE = re.compile(r'\d+')
+
+# Swiper navigation run in the browser, so each step is one round trip instead
+# of separate visibility/enabled checks, a click and a sleep
+_SWIPER_ENABLED_JS = """
+const swiperEnabled = btn => !!btn && btn.getClientRects().length > 0 && !btn.disabled
+    && !btn.classList.contains('swiper-button-disabled')
+    && btn.getAttribute('aria-disabled') !== 'true';
+const pause = ms => new Promise(r => setTimeout(r, ms));
+"""
+_SWIPER_REWIND_JS = """
+async (maxClicks) => {""" + _SWIPER_ENABLED_JS + """
+    const btn = document.querySelector('.swiper-button-prev');
+    let clicks = 0;
+    while (clicks < maxClicks && swiperEnabled(btn)) {
+        btn.click();
+        clicks++;
+        await pause(120);
+    }
+    return clicks;
+}
+"""
+_SWIPER_NEXT_JS = """
+async () => {""" + _SWIPER_ENABLED_JS + """
+    const btn = document.querySelector('.swiper-button-next');
+    if (!swiperEnabled(btn)) return false;
+    btn.click();
+    await pause(300);
+    return true;
+}
+"""
+
+# textContent of each element, or null for elements that aren't rendered
+# (the same visibility test as the swiper checks above)
+_VISIBLE_TEXTS_JS = "els => els.map(e => e.getClientRects().length ? e.textContent : null)"
+
+# Keys that mark a dict with an 'id' as a recipe in API responses
+_RECIPE_CONTEXT_KEYS = frozenset(('name', 'title', 'recipe', 'ingredient', 'direction'))
+
+# Close buttons of popups that can cover the delivery date buttons
+_MODAL_CLOSE_SELECTORS = (
+    "a:has-text('Laat deze popup niet meer zien op dit apparaat')",
+    "button:has-text('×')",
+    "button[aria-label='Close']",
+    ".modal .close",
+    "ngb-modal-window button",
+)
+
+def dismiss_modals(page):
+    """Close a popup/modal that might be blocking clicks on the date buttons."""
     try:
-        dialog = page.locator("#CybotCookiebotDialog")
-        if dialog.is_visible(timeout=1500):
-            for sel in selectors:
-                loc = page.locator(sel)
-                if loc.count() and loc.first.is_visible():
-                    loc.first.click(timeout=1500)
+        # Try pressing Escape first
+        page.keyboard.press("Escape")
+        page.wait_for_timeout(500)
+        
+        # Try clicking specific close buttons
+        for selector in _MODAL_CLOSE_SELECTORS:
+            try:
+                if page.locator(selector).count():
+                    page.locator(selector).first.click(timeout=1000)
+                    page.wait_for_timeout(500)
                     break
-            dialog.wait_for(state="hidden", timeout=5000)
-    except Exception:
+            except:
+                continue
+                
+    except:
+        pass
+
+def click_date_button(page, button):
+    """Click a date button and wait for the recipe list call it triggers.
+
+    Overlays are dismissed once before the walk; only when a click can't get
+    through are they dismissed again, after which the click is retried once.
+    """
+    for attempt in range(2):
+        clicked = False
         try:
-            el = page.query_selector("#CybotCookiebotDialog")
-            page.evaluate("d => d && d.remove()", el)
-        except Exception:
-            pass
+            with page.expect_response(lambda r: "recipebff/v1/recipe/list" in r.url, timeout=5000):
+                button.click(timeout=3000)
+                clicked = True
+            return
+        except PWTimeout:
+            if clicked or attempt:
+                return  # no list call for this date, or still blocked
+        print("    Click blocked, dismissing overlays and retrying")
+        dismiss_cookiebot(page)
+        dismiss_modals(page)
 
-def generate_date_range(start_date, end_date=None):
-    """Generate weekly dates from start_date to end_date (or current date)."""
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    if end_date is None:
-        end = datetime.now()
-    else:
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-    
-    dates = []
-    current = start
-    while current <= end:
-        dates.append(current.strftime("%Y-%m-%d"))
-        current += timedelta(weeks=1)
-    
-    return dates
+def extract_all_recipe_ids(page, known_dates=None):
+    """Extract recipe IDs by clicking through all available dates in the navigation.
 
-def extract_all_recipe_ids(page):
-    """Extract recipe IDs by clicking through all available dates in the navigation."""
+    known_dates: date button texts handled on earlier runs; these are not clicked
+    again, and every newly clicked date is appended to the list.
+    """
     print(f"Extracting recipe IDs from all available dates...")
     
-    all_recipe_ids = []
+    # Insertion-ordered set of every recipe ID seen so far
+    seen_ids = {}
+    n_known = len(known_dates) if known_dates is not None else 0
     captured_responses = []
     
     def handle_response(response):
         """Capture API responses that might contain recipe data."""
         if ("recipebff/v1/recipe/list" in response.url):
-            # Extract recipe IDs directly from the URL parameters
-            import re
-            from urllib.parse import urlparse, parse_qs
-            
-            parsed_url = urlparse(response.url)
-            query_params = parse_qs(parsed_url.query)
-            
-            if 'ids' in query_params:
-                ids_param = query_params['ids'][0]
-                # Split by comma and URL decode
-                from urllib.parse import unquote
-                ids_param = unquote(ids_param)
-                recipe_ids_from_url = [id.strip() for id in ids_param.split(',') if id.strip().isdigit()]
-                
-                if recipe_ids_from_url:
-                    all_recipe_ids.extend(recipe_ids_from_url)
-                    print(f"  Found recipe IDs in URL: {recipe_ids_from_url} from {response.url}")
+            # Extract recipe IDs directly from the ids= URL parameter
+            match = _IDS_RE.search(response.url)
+            if match:
+                new_ids = [i for i in _DIGIT_RE.findall(unquote(match.group(1))) if i not in seen_ids]
+                if new_ids:
+                    seen_ids.update(dict.fromkeys(new_ids))
+                    print(f"  +{len(new_ids)} ids (total {len(seen_ids)})")
             
             captured_responses.append({"url": response.url})
         elif ("list" in response.url.lower() and "recipe" in response.url.lower()):
@@ -94,64 +143,30 @@ def extract_all_recipe_ids(page):
     
     try:
         # Navigate to user page
-        page.goto("https://www.ekomenu.nl/user", wait_until="domcontentloaded")
+        robust_goto(page, "https://www.ekomenu.nl/user")
         dismiss_cookiebot(page)
         try:
-            page.wait_for_load_state("networkidle", timeout=5000)
-        except:
-            pass  # Don't wait too long
-        page.wait_for_timeout(1000)
+            # The delivery date buttons are what we need; don't wait for networkidle
+            page.wait_for_selector("#deliveryboxes", timeout=8000)
+        except PWTimeout:
+            pass
         
         # Dismiss any modal that might be blocking clicks
-        try:
-            # Try pressing Escape first
-            page.keyboard.press("Escape")
-            page.wait_for_timeout(500)
-            
-            # Try clicking specific close buttons
-            close_selectors = [
-                "a:has-text('Laat deze popup niet meer zien op dit apparaat')",
-                "button:has-text('×')",
-                "button[aria-label='Close']",
-                ".modal .close",
-                "ngb-modal-window button"
-            ]
-            
-            for selector in close_selectors:
-                try:
-                    if page.locator(selector).count():
-                        page.locator(selector).first.click(timeout=1000)
-                        page.wait_for_timeout(500)
-                        break
-                except:
-                    continue
-                    
-        except:
-            pass
+        dismiss_modals(page)
         
         # Navigate to the oldest dates using the previous button
         print("  Navigating to oldest available dates...")
-        prev_button = page.locator(".swiper-button-prev")
         
-        # Keep clicking the previous button until we reach the beginning
-        prev_clicks = 0
-        while prev_clicks < 200:  # Prevent infinite loop
-            try:
-                if prev_button.is_visible() and prev_button.is_enabled():
-                    prev_button.click(timeout=2000)
-                    page.wait_for_timeout(500)  # Wait for navigation
-                    prev_clicks += 1
-                else:
-                    print(f"    Reached oldest dates after {prev_clicks} previous clicks")
-                    break
-            except Exception as e:
-                print(f"    Reached beginning or error: {e}")
-                break
+        # Click the previous button until it is disabled, in a single browser call
+        try:
+            prev_clicks = page.evaluate(_SWIPER_REWIND_JS, 200)  # cap prevents an infinite loop
+            print(f"    Reached oldest dates after {prev_clicks} previous clicks")
+        except Exception as e:
+            print(f"    Reached beginning or error: {e}")
         
         # Now navigate forward through all dates and collect recipe IDs
         print("  Collecting recipe IDs from all dates...")
-        processed_dates = set()
-        next_button = page.locator(".swiper-button-next")
+        processed_dates = set(known_dates or ())
         
         # Process dates in chunks as we navigate forward
         navigation_round = 0
@@ -159,22 +174,29 @@ def extract_all_recipe_ids(page):
             try:
                 # Get currently visible date buttons
                 date_buttons = page.locator('#deliveryboxes > div[id^="deliverybox-"]')
-                button_count = date_buttons.count()
-                
-                if button_count == 0:
+                # Waits browser-side (with its own retry) until any box is rendered;
+                # hidden boxes are skipped below, they don't end the walk
+                try:
+                    expect(date_buttons.filter(visible=True).first).to_be_visible(timeout=2000)
+                except AssertionError:
                     print("    No date buttons found")
                     break
                 
+                # Fetch all button handles, and the texts of the visible ones, in one
+                # call each; a button that is gone by the time it is clicked fails
+                # inside the try
+                buttons = date_buttons.all()
+                button_texts = date_buttons.evaluate_all(_VISIBLE_TEXTS_JS)
+                
                 # Click through visible date buttons
                 new_dates_found = False
-                for i in range(button_count):
+                for i, (button, date_text) in enumerate(zip(buttons, button_texts)):
                     try:
-                        button = date_buttons.nth(i)
-                        if not button.is_visible():
+                        if date_text is None:
                             continue
                             
-                        # Get the date text for logging and deduplication
-                        date_text = button.text_content() or f"button-{i}"
+                        # The date text is used for logging and deduplication
+                        date_text = date_text or f"button-{i}"
                         
                         # Skip if we've already processed this date
                         if date_text in processed_dates:
@@ -187,23 +209,25 @@ def extract_all_recipe_ids(page):
                         # Clear previous responses for this date
                         responses_before = len(captured_responses)
                         
-                        # Click the date button
-                        button.click(timeout=3000)
-                        page.wait_for_timeout(800)  # Wait for API calls
+                        # Click the date button and wait for its recipe list call
+                        click_date_button(page, button)
                         
                         # Check if we got new responses
                         new_responses = len(captured_responses) - responses_before
                         print(f"    Got {new_responses} new API responses")
                         
+                        # Only a date whose list call arrived counts as done for
+                        # --incremental; failed clicks are retried on the next run
+                        if new_responses and known_dates is not None:
+                            known_dates.append(date_text)
+                        
                     except Exception as e:
                         print(f"    Error clicking date button {i}: {e}")
                         continue
                 
-                # Navigate to next set of dates
+                # Navigate to next set of dates (check, click and settle in one browser call)
                 try:
-                    if next_button.is_visible() and next_button.is_enabled():
-                        next_button.click(timeout=2000)
-                        page.wait_for_timeout(500)  # Wait for navigation
+                    if page.evaluate(_SWIPER_NEXT_JS):
                         navigation_round += 1
                     else:
                         print(f"    Reached end of dates after {navigation_round} navigation rounds")
@@ -218,61 +242,35 @@ def extract_all_recipe_ids(page):
         
         print(f"  Processed {len(processed_dates)} unique dates total")
         
-        # Remove duplicates while preserving order
-        unique_ids = list(dict.fromkeys(all_recipe_ids))
-        print(f"  Found {len(unique_ids)} unique recipe IDs total: {unique_ids}")
-        return unique_ids
+        print(f"  Found {len(seen_ids)} unique recipe IDs total")
+        return list(seen_ids)
         
     except Exception as e:
         print(f"  Error extracting recipe IDs: {e}")
+        # Nothing from this run is kept, so don't mark its dates as processed
+        if known_dates is not None:
+            del known_dates[n_known:]
         return []
 
 def extract_ids_from_response(data, url):
     """Extract recipe IDs from API response data."""
     ids = []
-    
-    def search_for_ids(obj, path=""):
-        """Recursively search for recipe IDs in nested data structures."""
+    # Walk nested dicts/lists with an explicit stack, in document order
+    stack = [data]
+    while stack:
+        obj = stack.pop()
         if isinstance(obj, dict):
             # Look for 'id' field that looks like a recipe ID
-            if 'id' in obj:
-                id_value = obj['id']
-                if isinstance(id_value, (int, str)) and str(id_value).isdigit():
-                    # Additional context clues that this might be a recipe
-                    if any(key in obj for key in ['name', 'title', 'recipe', 'ingredient', 'direction']):
-                        ids.append(str(id_value))
-            
-            # Recursively search nested objects
-            for key, value in obj.items():
-                search_for_ids(value, f"{path}.{key}" if path else key)
-                
+            id_value = obj.get('id')
+            if isinstance(id_value, (int, str)) and str(id_value).isdigit():
+                # Additional context clues that this might be a recipe
+                if not _RECIPE_CONTEXT_KEYS.isdisjoint(obj):
+                    ids.append(str(id_value))
+            stack.extend(reversed(obj.values()))
         elif isinstance(obj, list):
-            for i, item in enumerate(obj):
-                search_for_ids(item, f"{path}[{i}]")
-    
-    search_for_ids(data)
-    return ids
-
-def load_existing_ids(ids_file):
-    """Load existing recipe IDs from file if it exists."""
-    if not ids_file.exists():
-        return set()
-    
-    ids = set()
-    with open(ids_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and line.isdigit():
-                ids.add(line)
+            stack.extend(reversed(obj))
     return ids
 
-def save_ids(ids_file, recipe_ids):
-    """Save recipe IDs to file, sorted for consistent output."""
-    ids_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(ids_file, 'w') as f:
-        for recipe_id in sorted(recipe_ids, key=int):
-            f.write(f"{recipe_id}\n")
-
 def main():
     parser = argparse.ArgumentParser(description="Extract Ekomenu recipe IDs from API calls")
     parser.add_argument("--start-date", default="2023-10-02", 
@@ -282,9 +280,9 @@ def main():
     parser.add_argument("--output", "-o", default="recipe_ids.txt",
                        help="Output file for recipe IDs (default: recipe_ids.txt)")
     parser.add_argument("--use-state", 
-                       help="Path to saved session state for login")
+                       help=f"Path to saved session state for login (default: {DEFAULT_STATE_PATH})")
     parser.add_argument("--save-state",
-                       help="Path to save session state after login")
+                       help="Path to save session state after login (default: the --use-state path)")
     parser.add_argument("--email", help="Ekomenu email")
     parser.add_argument("--password", help="Ekomenu password")
     parser.add_argument("--headful", action="store_true", 
@@ -305,6 +303,8 @@ def main():
     
     ids_file = Path(args.output)
     existing_ids = load_existing_ids(ids_file) if args.incremental else set()
+    dates_file = ids_file.with_suffix('.processed_dates.txt')
+    known_dates = load_processed_dates(dates_file) if args.incremental else []
     all_ids = existing_ids.copy()
     
     # Generate date range
@@ -317,34 +317,41 @@ def main():
     with sync_playwright() as pw:
         browser = pw.chromium.launch(headless=not args.headful)
         
-        # Set up browser context
+        # Set up browser context, reusing a recent saved session if there is one
+        state_path = Path(args.use_state) if args.use_state else DEFAULT_STATE_PATH
+        save_path = Path(args.save_state) if args.save_state else state_path
+        need_login = not state_is_fresh(state_path)
+        if need_login and args.use_state and state_path.exists():
+            # A session file named on the command line is still tried when stale;
+            # if the site rejects it, the crawl below logs in again
+            print(f"Saved session {state_path} is older than {STATE_MAX_AGE // 3600}h, trying it anyway")
+            need_login = False
+        elif need_login and state_path.exists():
+            print(f"Saved session {state_path} is older than {STATE_MAX_AGE // 3600}h, logging in again")
         ctx_kwargs = {}
-        if args.use_state:
-            ctx_kwargs["storage_state"] = args.use_state
+        if not need_login:
+            ctx_kwargs["storage_state"] = str(state_path)
+            print(f"Using saved session state from {state_path}")
         context = browser.new_context(**ctx_kwargs)
+        preseed_cookie_consent(context)
+        block_unneeded_requests(context)
         page = context.new_page()
         
         # Login if needed
-        if not args.use_state:
-            page.goto("https://www.ekomenu.nl/login", wait_until="domcontentloaded")
-            dismiss_cookiebot(page)
-            
-            page.fill("input[type='email']", email)
-            page.fill("input[type='password']", password)
-            page.click("button:has-text('Inloggen')")
-            page.wait_for_load_state("networkidle", timeout=15000)
-            
-            if "login" in page.url:
-                print("Login failed - still on login page")
-                sys.exit(1)
-                
-            if args.save_state:
-                context.storage_state(path=args.save_state)
-                print(f"Session state saved to {args.save_state}")
+        if need_login and not login_and_save(page, email, password, save_path):
+            print("Login failed - still on login page")
+            sys.exit(1)
         
         # Extract all recipe IDs by clicking through available dates
         new_ids_count = 0
-        extracted_ids = extract_all_recipe_ids(page)
+        extracted_ids = extract_all_recipe_ids(page, known_dates)
+        if "login" in page.url and not need_login:
+            # The saved session was rejected: log in again and redo the crawl
+            print("Saved session expired, logging in again")
+            if not login_and_save(page, email, password, save_path):
+                print("Login failed - still on login page")
+                sys.exit(1)
+            extracted_ids = extract_all_recipe_ids(page, known_dates)
         
         # Add new IDs
         for recipe_id in extracted_ids:
@@ -352,11 +359,16 @@ def main():
                 all_ids.add(recipe_id)
                 new_ids_count += 1
         
+        # Refresh the saved session so the next run can skip the login
+        if "login" not in page.url:
+            save_state(context, save_path)
+        
         context.close()
         browser.close()
     
     # Save results
-    save_ids(ids_file, all_ids)
+    sorted_ids = save_ids(ids_file, all_ids)
+    save_processed_dates(dates_file, known_dates)
     
     print(f"\nCompleted!")
     print(f"Total recipe IDs found: {len(all_ids)}")
@@ -364,11 +376,9 @@ def main():
     print(f"IDs saved to: {ids_file}")
     
     # Optionally convert to URLs
-    if len(all_ids) > 0:
+    if sorted_ids:
         urls_file = ids_file.with_suffix('.urls.txt')
-        with open(urls_file, 'w') as f:
-            for recipe_id in sorted(all_ids, key=int):
-                f.write(f"https://www.ekomenu.nl/user?recipe={recipe_id}\n")
+        urls_file.write_text("".join(f"{recipe_url(recipe_id)}\n" for recipe_id in sorted_ids))
         print(f"URLs saved to: {urls_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+"""
+Shared YAML rendering for Ekomenu recipes (Paprika import format).
+Used by ekomenu2yml.py and combine_recipes.py so both write identical output.
+"""
+
+# Field order in the output, after "name"
+_FIELDS = ("servings", "cook_time", "source", "source_url", "photo",
+           "nutritional_info", "notes", "ingredients", "directions")
+# Fields always written as block scalars (|)
+_MULTILINE = frozenset({"notes", "ingredients", "directions", "nutritional_info", "photo"})
+
+def render_recipe_fields(d: dict, out, indent: str):
+    """Write the recipe fields of d to the text stream out, indented with indent."""
+    prefix = f"{indent}  "
+    for k in _FIELDS:
+        v = d.get(k)
+        if v in (None, "", []):
+            continue
+        if isinstance(v, str) and ("\n" in v or k in _MULTILINE):
+            out.write(f"{indent}{k}: |\n{prefix}")
+            out.write(v.replace("\n", "\n" + prefix))
+            out.write("\n")
+        else:
+            out.write(f"{indent}{k}: {v}\n")
+
+def write_yaml(data, out):
+    """Write one recipe (dict) as a mapping, or several (list) as a sequence, to out."""
+    if isinstance(data, list):
+        # Multiple recipes
+        for i, d in enumerate(data):
+            if i > 0:
+                out.write("\n")
+            out.write("- name: " + (d.get("name") or "") + "\n")
+            render_recipe_fields(d, out, "  ")
+    else:
+        # Single recipe
+        out.write("name: " + (data.get("name") or "") + "\n")
+        render_recipe_fields(data, out, "")